@@ -1,3 +1,78 @@
-from django.test import TestCase
+from django.db.models import QuerySet
+from django.db.models.query import ModelIterable, ValuesListIterable
+from django.test import SimpleTestCase
+from gsheets.gsheets import SheetPushInterface
+from unittest import mock
+from .models import Car, Person
 
-# Create your tests here.
+
+class PushQuerysetTestCase(SimpleTestCase):
+    def setUp(self):
+        # have iterator() hand back the queryset it was called on, so the query can be inspected without a DB
+        patcher = mock.patch.object(QuerySet, 'iterator', autospec=True, side_effect=lambda qs, chunk_size: qs)
+        self.iterator = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_interface(self, model_cls, push_fields, queryset=None, **kwargs):
+        return SheetPushInterface(
+            model_cls, 'spreadsheet', sheet_name='Sheet1', data_range='A1:Z', model_id_field='id',
+            sheet_id_field='Django GUID', batch_size=100, max_rows=30000, max_col='Z',
+            queryset=model_cls.objects.all() if queryset is None else queryset, push_fields=push_fields, **kwargs
+        )
+
+    def test_streams_only_push_fields(self):
+        queryset = self.get_interface(Car, ('id', 'brand', 'color')).get_push_queryset()
+
+        self.iterator.assert_called_once_with(mock.ANY, chunk_size=100)
+        self.assertEqual(queryset.query.deferred_loading, (frozenset({'id', 'brand', 'color'}), False))
+
+    def test_loads_every_field_when_pushing_non_fields(self):
+        queryset = self.get_interface(Car, ('id', 'brand', '__str__')).get_push_queryset()
+
+        self.iterator.assert_called_once_with(mock.ANY, chunk_size=100)
+        self.assertEqual(queryset.query.deferred_loading, (frozenset(), True))
+
+    def test_iterates_non_querysets_as_they_are(self):
+        cars = [Car(id=1), Car(id=2)]
+
+        self.assertEqual(list(self.get_interface(Car, ('id',), queryset=cars).get_push_queryset()), cars)
+        self.iterator.assert_not_called()
+
+    def test_pushes_values_list_of_model_fields(self):
+        queryset = self.get_interface(Car, ('id', 'owner', 'brand'), use_values_list=True).get_push_queryset()
+
+        self.iterator.assert_called_once_with(mock.ANY, chunk_size=100)
+        self.assertIs(queryset._iterable_class, ValuesListIterable)
+        self.assertEqual(queryset.query.values_select, ('id', 'owner', 'brand'))
+
+    def test_pushes_instances_when_values_list_not_possible(self):
+        interface = self.get_interface(Car, ('id', 'brand', '__str__'), use_values_list=True)
+
+        self.assertFalse(interface.pushes_values_list())
+        self.assertIs(interface.get_push_queryset()._iterable_class, ModelIterable)
+
+    def test_push_relations_split_by_how_they_load(self):
+        self.assertEqual(self.get_interface(Car, ('id', 'owner', 'brand')).get_push_relations(), (['owner'], []))
+        self.assertEqual(self.get_interface(Person, ('guid', 'cars')).get_push_relations(), ([], ['cars']))
+
+    def test_selects_related_push_fields(self):
+        queryset = self.get_interface(Car, ('id', 'owner', 'brand')).get_push_queryset()
+
+        self.assertEqual(queryset.query.select_related, {'owner': {}})
+        self.assertEqual(queryset._prefetch_related_lookups, ())
+
+    @mock.patch('django.VERSION', (4, 1))
+    def test_streams_prefetched_push_fields(self):
+        queryset = self.get_interface(Person, ('guid', 'cars')).get_push_queryset()
+
+        self.iterator.assert_called_once_with(mock.ANY, chunk_size=100)
+        self.assertEqual(queryset._prefetch_related_lookups, ('cars',))
+
+    @mock.patch('django.VERSION', (4, 0))
+    @mock.patch.object(QuerySet, '__iter__', lambda qs: iter([]))
+    def test_warns_when_prefetching_loads_whole_queryset(self):
+        with self.assertLogs('gsheets.gsheets', level='WARNING') as logs:
+            self.get_interface(Person, ('guid', 'cars')).get_push_queryset()
+
+        self.assertIn("loading the whole queryset into memory to prefetch ['cars']", logs.output[0])
+        self.iterator.assert_not_called()
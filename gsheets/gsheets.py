@@ -1,19 +1,51 @@
 from googleapiclient.discovery import build
+from googleapiclient.discovery_cache.base import Cache
 from googleapiclient.errors import HttpError
-from django.core.exceptions import ObjectDoesNotExist
+from googleapiclient.http import build_http
+import google_auth_httplib2
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.db.models import QuerySet
+import django
 from .auth import get_gapi_credentials
 from .signals import sheet_row_processed
 from . import decorators
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+import operator
 import string
+import threading
+import time
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+# matches the start/end rows and cols of a range like 'Sheet1!A1:Z'
+ROW_RANGE_RE = re.compile(r'[A-Z]+(\d+):[A-Z]+(\d*)')
+COL_RANGE_RE = re.compile(r'([A-Z]+)\d*:([A-Z]+)\d*')
+
+# process-level cache of fetched sheet data, keyed on (spreadsheet ID, sheet range) to (fetch time, headers, rows)
+_sheet_cache = {}
+
+
+class DiscoveryCache(Cache):
+    """ process-level cache of API discovery documents, so building an API client doesn't refetch the document (over
+    a fresh connection) every time """
+    _documents = {}
+
+    def get(self, url):
+        return self._documents.get(url)
+
+    def set(self, url, content):
+        self._documents[url] = content
+
 
 class BaseSheetInterface(object):
+    # whether sheet data may be loaded from the process-level cache
+    reads_sheet_cache = True
+
     def __init__(self, model_cls, spreadsheet_id, sheet_name=None, data_range=None, model_id_field=None,
-                 sheet_id_field=None, batch_size=None, max_rows=None, max_col=None, **kwargs):
+                 sheet_id_field=None, batch_size=None, max_rows=None, max_col=None, sheet_cache_ttl=0, **kwargs):
         """
         :param model_cls: `models.Model` subclass this interface applies to
         :param spreadsheet_id: `str` ID of a Google Sheets spreadsheet
@@ -24,6 +56,7 @@ class BaseSheetInterface(object):
         :param batch_size: `int` the batch size determines at what point sheet data is written-out to the Google sheet
         :param max_rows: `int` the max rows to support in the sheet
         :param max_col: `str` max column to support in the sheet
+        :param sheet_cache_ttl: `int` seconds fetched sheet data may be reused by other interfaces in the process
         """
         self.model_cls = model_cls
         self.spreadsheet_id = spreadsheet_id
@@ -34,11 +67,20 @@ class BaseSheetInterface(object):
         self.batch_size = batch_size
         self.max_rows = max_rows
         self.max_col = max_col
+        self.sheet_cache_ttl = sheet_cache_ttl
 
         self._api = None
+        self._values_api = None
+        self._thread_local = threading.local()
         self._credentials = None
         self._sheet_data = None
+        # whether the sheet data was loaded from the process-level cache rather than fetched
+        self._sheet_data_cached = False
         self._sheet_headers = None
+        self._header_index = None
+        self._row_index = None
+        self._sheet_range_rows = None
+        self._sheet_range_cols = None
 
     @property
     def credentials(self):
@@ -64,27 +106,110 @@ class BaseSheetInterface(object):
         if self._api is not None:
             return self._api
 
-        self._api = build('sheets', 'v4', credentials=self.credentials)
+        self._api = build('sheets', 'v4', http=self.http, cache=DiscoveryCache())
         return self._api
 
+    @property
+    def http(self):
+        """ gets the authorized HTTP client for the current thread. httplib2 clients aren't thread-safe, so each
+        thread making requests gets its own
+        :return: `google_auth_httplib2.AuthorizedHttp`
+        """
+        http = getattr(self._thread_local, 'http', None)
+        if http is None:
+            http = self._thread_local.http = self.authorized_http()
+
+        return http
+
+    def authorized_http(self):
+        """ gets an HTTP client which authorizes its requests with our credentials, using the API client's default
+        socket timeout
+        :return: `google_auth_httplib2.AuthorizedHttp`
+        """
+        return google_auth_httplib2.AuthorizedHttp(self.credentials, http=build_http())
+
+    @property
+    def values_api(self):
+        """ gets the spreadsheets values resource, built once rather than walking the API resources per request """
+        if self._values_api is not None:
+            return self._values_api
+
+        self._values_api = self.api.spreadsheets().values()
+        return self._values_api
+
     @property
     def sheet_data(self):
         if self._sheet_data is not None:
             return self._sheet_data
 
-        api_res = self.api.spreadsheets().values().get(spreadsheetId=self.spreadsheet_id, range=self.sheet_range).execute()
-        self._sheet_data = api_res.get('values', [])
-        self._sheet_headers = self._sheet_data[0]
-        # remove the headers from the data
-        self._sheet_data = self._sheet_data[1:]
+        cached = self.get_cached_sheet()
+        if cached is not None:
+            logger.debug(f'using cached sheet data for {self.sheet_range}')
+            noop, self._sheet_headers, self._sheet_data = cached
+            self._sheet_data_cached = True
+        else:
+            # only the values are used, so don't have the API echo back the range and major dimension
+            api_res = self.values_api.get(
+                spreadsheetId=self.spreadsheet_id, range=self.sheet_range, majorDimension='ROWS', fields='values'
+            ).execute(http=self.http)
+            values = api_res.get('values', [])
+            self._sheet_headers = values[0]
+            # remove the headers from the data
+            self._sheet_data = values[1:]
+            self._sheet_data_cached = False
+            # sheet data is never modified in place, so interfaces can share the cached rows
+            if self.sheet_cache_ttl:
+                _sheet_cache[(self.spreadsheet_id, self.sheet_range)] = (
+                    time.monotonic(), self._sheet_headers, self._sheet_data
+                )
+
+        self._header_index = {name: i for i, name in enumerate(self._sheet_headers)}
+
+        # index the rows by the model ID stored in the sheet ID column so lookups don't scan the sheet
+        self._row_index = {}
+        duplicate_ids = []
+        if self.sheet_id_field in self._header_index:
+            sheet_id_ix = self._header_index[self.sheet_id_field]
+            for i, r in enumerate(self._sheet_data):
+                # rows without an ID haven't been synced to a model instance yet
+                if len(r) <= sheet_id_ix or r[sheet_id_ix] == '':
+                    continue
+
+                # first match wins, matching the behavior of a top-down scan
+                key = BaseSheetInterface.row_index_key(r[sheet_id_ix])
+                if key in self._row_index:
+                    duplicate_ids.append(key)
+                else:
+                    self._row_index[key] = i
+
+        if duplicate_ids:
+            logger.warning(f'found {len(duplicate_ids)} duplicate IDs in column {self.sheet_id_field}, only the first '
+                           f'row with each ID will be synced: {duplicate_ids[:10]}')
 
         return self._sheet_data
 
     @property
     def sheet_headers(self):
-        if not self._sheet_headers:
-            # self.sheet_data sets the headers
-            noop = self.sheet_data
+        if self._sheet_headers is not None:
+            return self._sheet_headers
+
+        cached = self.get_cached_sheet()
+        if cached is not None:
+            self._sheet_headers = cached[1]
+            self._header_index = {name: i for i, name in enumerate(self._sheet_headers)}
+            return self._sheet_headers
+
+        # the headers are the first row of the data range, so only that row needs to be fetched
+        cols_start, cols_end = self.sheet_range_cols
+        rows_start, rows_end = self.sheet_range_rows
+        header_range = BaseSheetInterface.get_sheet_range(
+            self.sheet_name, f'{cols_start}{rows_start}:{cols_end}{rows_start}'
+        )
+        api_res = self.values_api.get(
+            spreadsheetId=self.spreadsheet_id, range=header_range, majorDimension='ROWS', fields='values'
+        ).execute(http=self.http)
+        self._sheet_headers = api_res.get('values', [[]])[0]
+        self._header_index = {name: i for i, name in enumerate(self._sheet_headers)}
 
         return self._sheet_headers
 
@@ -97,7 +222,10 @@ class BaseSheetInterface(object):
         """
         :return: `two-tuple`
         """
-        row_match = re.search('[A-Z]+(\d+):[A-Z]+(\d*)', self.sheet_range)
+        if self._sheet_range_rows is not None:
+            return self._sheet_range_rows
+
+        row_match = ROW_RANGE_RE.search(self.sheet_range)
         try:
             start, end = row_match.groups()
         except ValueError:
@@ -106,20 +234,27 @@ class BaseSheetInterface(object):
         if end == '':
             end = self.max_rows
 
-        return int(start), int(end)
+        self._sheet_range_rows = int(start), int(end)
+
+        return self._sheet_range_rows
 
     @property
     def sheet_range_cols(self):
         """
         :return: `two-tuple`
         """
-        col_match = re.search('([A-Z]+)\d*:([A-Z]+)\d*', self.sheet_range)
+        if self._sheet_range_cols is not None:
+            return self._sheet_range_cols
+
+        col_match = COL_RANGE_RE.search(self.sheet_range)
         try:
             start, end = col_match.groups()
         except ValueError:
             start, end = col_match.groups()[0], self.max_col
 
-        return start, end
+        self._sheet_range_cols = start, end
+
+        return self._sheet_range_cols
 
     @staticmethod
     def convert_col_letter_to_number(col_letter):
@@ -131,10 +266,29 @@ class BaseSheetInterface(object):
         """ converts a column index - like 1 - to it's alphabetic equivalent (like 'A') """
         return string.ascii_lowercase[col_number].upper()
 
+    @staticmethod
+    def row_index_key(model_id):
+        """ normalizes a model ID, or the value of a sheet ID cell, to the key used in the row index """
+        return model_id if isinstance(model_id, str) else str(model_id)
+
     @staticmethod
     def get_sheet_range(sheet_name, data_range):
         return '!'.join([sheet_name, data_range])
 
+    def get_cached_sheet(self):
+        """ gets the cached data for this interface's sheet range, if this interface reads the cache and it's fresh
+        :return: `three-tuple` of fetch time, headers and rows, or None
+        """
+        cached = _sheet_cache.get((self.spreadsheet_id, self.sheet_range))
+        if not self.reads_sheet_cache or cached is None or time.monotonic() - cached[0] >= self.sheet_cache_ttl:
+            return None
+
+        return cached
+
+    def invalidate_sheet_cache(self):
+        """ drops any cached data for this interface's sheet range, forcing the next load to fetch from the API """
+        _sheet_cache.pop((self.spreadsheet_id, self.sheet_range), None)
+
     def column_index(self, field_name):
         """ given a canonical field name (like 'Name'), get the column index of that field in the sheet. This relies
         on the first row in the sheet having a cell with the name of the given field
@@ -144,7 +298,10 @@ class BaseSheetInterface(object):
         """
         logger.debug(f'got header row {self.sheet_headers}')
 
-        return self.sheet_headers.index(field_name)
+        try:
+            return self._header_index[field_name]
+        except KeyError:
+            raise ValueError(f'{field_name} is not in the header row')
 
     def existing_row(self, **data):
         """ given the data to be synced to a row, check if it already exists in the sheet and - if it does - return
@@ -154,18 +311,24 @@ class BaseSheetInterface(object):
         :raises: `KeyError` if the data doesn't contain the ID field for the model
         :raises: `ValueError` if the columns don't contain the Sheet ID col
         """
-        model_id = data[self.model_id_field]
-        sheet_id_ix = self.column_index(self.sheet_id_field)
+        return self.existing_row_for_id(data[self.model_id_field])
 
-        # look through the sheet ID column for the model ID
-        for i, r in enumerate(self.sheet_data):
-            try:
-                if r[sheet_id_ix] == str(model_id):
-                    return i
-            except IndexError:
-                continue
+    def existing_row_for_id(self, model_id):
+        """ given the ID of a model instance, check if it already exists in the sheet and - if it does - return
+        its index
+        :param model_id: the ID of the model instance
+        :return: `int` the index of the row containing the ID if it exists, None otherwise
+        :raises: `ValueError` if the columns don't contain the Sheet ID col
+        """
+        if self._row_index is None:
+            # loading the sheet data builds the row index
+            noop = self.sheet_data
+
+        # without the sheet ID col every row would look new, so don't carry on without it
+        if self.sheet_id_field not in self._header_index:
+            raise ValueError(f'{self.sheet_id_field} is not in the header row')
 
-        return None
+        return self._row_index.get(BaseSheetInterface.row_index_key(model_id))
 
     @decorators.backoff_on_exception(decorators.expo, HttpError)
     def writeout(self, range, data):
@@ -177,9 +340,12 @@ class BaseSheetInterface(object):
             'values': data
         }
 
-        return self.api.spreadsheets().values().update(
+        response = self.values_api.update(
             spreadsheetId=self.spreadsheet_id, range=range, valueInputOption='USER_ENTERED', body=body
-        ).execute()
+        ).execute(http=self.http)
+        self.invalidate_sheet_cache()
+
+        return response
 
     @decorators.backoff_on_exception(decorators.expo, HttpError)
     def writeout_batch(self, ranges, data):
@@ -197,8 +363,9 @@ class BaseSheetInterface(object):
             'data': [{'range': r, 'values': values} for r, values in request_data]
         }
 
-        request = self.api.spreadsheets().values().batchUpdate(spreadsheetId=self.spreadsheet_id, body=request_body)
-        response = request.execute()
+        request = self.values_api.batchUpdate(spreadsheetId=self.spreadsheet_id, body=request_body)
+        response = request.execute(http=self.http)
+        self.invalidate_sheet_cache()
 
         logger.debug(f'got response {response} executing writeout in range {range}')
 
@@ -207,74 +374,218 @@ class BaseSheetInterface(object):
 
 class SheetPushInterface(BaseSheetInterface):
     """ functionality to push data from a Django model to a google sheet. """
+    # pushes write to rows by their position, so they always load fresh data in case rows were moved since caching
+    reads_sheet_cache = False
+
     def __init__(self, *args, **kwargs):
         super(SheetPushInterface, self).__init__(*args, **kwargs)
         self.queryset = kwargs.pop('queryset')
-        self.push_fields = kwargs.pop('push_fields', [f.name for f in self.model_cls._meta.fields])
+        self.push_fields = kwargs.pop('push_fields', tuple(f.name for f in self.model_cls._meta.fields))
+        # the number of batch writeouts which may be in flight at once
+        self.writeout_workers = kwargs.pop('writeout_workers', 1)
+        # whether to push rows of field values straight from the DB rather than reading them off model instances
+        self.use_values_list = kwargs.pop('use_values_list', False)
+
+        self._push_field_cols = None
+        self._model_id_value_ix = None
+        self._push_row_width = None
+        # rows which have been upserted but not yet written out, keyed on their index in the sheet
+        self._changed_rows = {}
+        # the index the next new row will get in the sheet, as new rows are added after the existing rows
+        self._next_row_ix = None
 
     def upsert_table(self):
         """ upserts objects of this instance type to Sheets """
+        queryset = self.get_push_queryset()
+        fields = tuple(self.push_fields)
+        if self.pushes_values_list():
+            # rows from values_list are already tuples of the push field values
+            getter = tuple
+        else:
+            # attrgetter fetches all the fields in one call, but only returns a tuple when given more than one
+            getter = operator.attrgetter(*fields) if len(fields) > 1 else lambda obj: (getattr(obj, fields[0]),)
+
+        # batches write to distinct rows, so their writeouts can run while the next batch is upserted
+        with ThreadPoolExecutor(max_workers=self.writeout_workers) as executor:
+            writeouts = set()
+            while True:
+                batch = list(islice(queryset, self.batch_size))
+                if not batch:
+                    break
+
+                for obj in batch:
+                    self.upsert_sheet_data(fields, getter(obj))
+
+                writeout_ranges, writeout_data = self.pop_changed_rows()
+                if not writeout_ranges:
+                    continue
+
+                # surface errors from finished writeouts before going on, and if as many writeouts as can run are
+                # already in flight, wait for one to finish rather than queueing more
+                done, writeouts = wait(
+                    writeouts, timeout=0 if len(writeouts) < self.writeout_workers else None,
+                    return_when=FIRST_COMPLETED
+                )
+                for writeout in done:
+                    writeout.result()
+
+                writeouts.add(executor.submit(self.writeout_batch, writeout_ranges, writeout_data))
+
+            for writeout in writeouts:
+                writeout.result()
+
+        logger.info('FINISHED WITH TABLE UPSERT')
+
+    def pushes_values_list(self):
+        """ whether the pushed rows can be read with values_list, which skips building model instances. Only possible
+        when pushing a queryset and every push field is a concrete model field (not e.g. a property)
+        :return: `bool`
+        """
+        return self.use_values_list and isinstance(self.queryset, QuerySet) and self.pushes_concrete_fields()
+
+    def pushes_concrete_fields(self):
+        """ whether every push field is a concrete model field
+        :return: `bool`
+        """
+        concrete_fields = {f.name for f in self.model_cls._meta.concrete_fields}
+        return len(self.push_fields) > 0 and all(f in concrete_fields for f in self.push_fields)
+
+    def get_push_queryset(self):
+        """ gets an iterator over the queryset to push, loading only the pushed fields and streaming rows from the DB
+        in chunks of the batch size rather than caching the whole queryset
+        :return: `iterator` of model instances, or of tuples of push field values if pushing a values_list
+        """
         queryset = self.queryset
-        last_writeout = 0
-        cols_start, cols_end = self.sheet_range_cols
-        rows_start, rows_end = self.sheet_range_rows
+        if not isinstance(queryset, QuerySet):
+            # any iterable of instances may be pushed, only querysets can be narrowed and streamed
+            return iter(queryset)
+
+        if self.pushes_values_list():
+            return queryset.values_list(*self.push_fields).iterator(chunk_size=self.batch_size)
+
+        if self.pushes_concrete_fields():
+            # push fields that aren't model fields (e.g. properties) may rely on any field, so only defer when it's safe
+            queryset = queryset.only(*self.push_fields)
+
+        # load related push fields up front rather than querying for them per instance
+        select_related, prefetch_related = self.get_push_relations()
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+            if django.VERSION < (4, 1):
+                # iterator() ignores prefetch_related before Django 4.1, so the queryset has to be evaluated instead
+                logger.warning(f'loading the whole queryset into memory to prefetch {prefetch_related}, upgrade to '
+                               f'Django 4.1+ to stream it in batches')
+                return iter(queryset)
+
+        return queryset.iterator(chunk_size=self.batch_size)
+
+    def get_push_relations(self):
+        """ finds the push fields which are relations, split by how they should be loaded
+        :return: `two-tuple` of `list` of `str` fields to select_related and `list` of `str` fields to prefetch_related
+        """
+        select_related = []
+        prefetch_related = []
+        for field_name in self.push_fields:
+            try:
+                field = self.model_cls._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                continue
 
-        for i, obj in enumerate(queryset):
-            if i > 0 and i % self.batch_size == 0:
-                writeout_range_start_row = (rows_start + 1) + i
-                writeout_range_end_row = writeout_range_start_row + self.batch_size
-                writeout_range = BaseSheetInterface.get_sheet_range(
-                    self.sheet_name, f'{cols_start}{writeout_range_start_row}:{cols_end}{writeout_range_end_row}'
-                )
+            if not field.is_relation:
+                continue
 
-                writeout_data_start_row = (rows_start - 1) + i
-                writeout_data_end_row = writeout_data_start_row + self.batch_size
-                writeout_data = self.sheet_data[writeout_data_start_row:writeout_data_end_row]
+            # only concrete forward relations can be joined, others (like generic foreign keys) have to be prefetched
+            if (field.many_to_one or field.one_to_one) and field.concrete:
+                select_related.append(field_name)
+            else:
+                prefetch_related.append(field_name)
 
-                logger.debug(f'writing out {len(writeout_data)} rows of data to {writeout_range}')
+        return select_related, prefetch_related
 
-                self.writeout_batch([writeout_range], [writeout_data])
-                last_writeout = i
+    def pop_changed_rows(self):
+        """ gets the ranges and data of every row upserted since the last writeout, with each contiguous block of rows
+        in its own range, and resets the set of upserted rows
+        :return: `two-tuple` of `list` of `str` ranges and `list` of `list` of `list` data for each range
+        """
+        if not self._changed_rows:
+            return [], []
 
-            push_data = {f: getattr(obj, f) for f in self.push_fields}
-            self.upsert_sheet_data(**push_data)
+        cols_start, cols_end = self.sheet_range_cols
+        rows_start, rows_end = self.sheet_range_rows
+        changed_row_data = self._changed_rows
+        changed_rows = sorted(changed_row_data)
+        self._changed_rows = {}
 
-        # writeout any remaining data
-        if last_writeout < len(queryset):
-            logger.debug(f'writing out {len(queryset) - last_writeout} final rows of data')
-            writeout_range = BaseSheetInterface.get_sheet_range(
-                self.sheet_name, f'{cols_start}{max(2, last_writeout)}:{cols_end}{rows_end}'
-            )
-            self.writeout_batch([writeout_range], [self.sheet_data[last_writeout:]])
+        writeout_ranges = []
+        writeout_data = []
+        block_start = 0
+        for i in range(1, len(changed_rows) + 1):
+            # a gap in the row indexes (or the last row) ends a block
+            if i < len(changed_rows) and changed_rows[i] == changed_rows[i - 1] + 1:
+                continue
 
-        logger.info('FINISHED WITH TABLE UPSERT')
+            start_ix, end_ix = changed_rows[block_start], changed_rows[i - 1]
+            # + 1 to not count header
+            writeout_ranges.append(BaseSheetInterface.get_sheet_range(
+                self.sheet_name, f'{cols_start}{rows_start + start_ix + 1}:{cols_end}{rows_start + end_ix + 1}'
+            ))
+            writeout_data.append([changed_row_data[ix] for ix in changed_rows[block_start:i]])
+            block_start = i
+
+        logger.debug(f'writing out {len(changed_rows)} rows of data to {len(writeout_ranges)} ranges')
 
-    def upsert_sheet_data(self, **data):
-        """ upserts the data, given as a dict of field/values, to the sheet. If the data already exists, replaces
-        its previous value
-        :param data: `dict` of field/value
+        return writeout_ranges, writeout_data
+
+    def upsert_sheet_data(self, fields, values):
+        """ upserts the data, given as a sequence of fields and their values, to the sheet. If the data already
+        exists, replaces its previous value
+        :param fields: `tuple` of `str` field names. Must be the same for every call on this interface
+        :param values: `tuple` of values, in the same order as the fields
+        :raises: `ValueError` if the fields don't contain the ID field for the model
+        """
+        # the pushed fields are the same for every row, so resolve their columns once
+        if self._push_field_cols is None:
+            # every row is needed to find existing rows, so load the data (and headers with it) before resolving the
+            # columns rather than fetching the headers on their own
+            self._next_row_ix = len(self.sheet_data)
+            self._push_field_cols = self.get_push_field_cols(fields)
+            self._model_id_value_ix = fields.index(self.model_id_field)
+            self._push_row_width = self._push_field_cols[-1][1] + 1 if self._push_field_cols else 0
+
+        # place each value in its own column. Cells left as None are skipped by the Sheets API on write, so columns
+        # which aren't pushed keep whatever is in the sheet
+        row_data = [None] * self._push_row_width
+        for value_ix, ix in self._push_field_cols:
+            row_data[ix] = values[value_ix]
+        model_id = values[self._model_id_value_ix]
+
+        # get the row to update if it exists, otherwise we will add a new row after the existing rows. The rows are
+        # only held until they're written out, the loaded sheet data is left as it is
+        row_ix = self.existing_row_for_id(model_id)
+        if row_ix is None:
+            row_ix = self._next_row_ix
+            self._next_row_ix += 1
+            self._row_index[BaseSheetInterface.row_index_key(model_id)] = row_ix
+
+        self._changed_rows[row_ix] = row_data
+
+    def get_push_field_cols(self, fields):
+        """ resolves the given fields to the index of the sheet column storing their data, skipping fields which
+        have no header in the sheet
+        :param fields: `iterable` of `str` field names
+        :return: `tuple` of (`int`, `int`) two-tuples of the position of the field in fields and its column index,
+            ordered by column index
         """
-        field_indexes = []
-        for field in data.keys():
+        field_cols = []
+        for value_ix, field in enumerate(fields):
             try:
-                field_indexes.append((field, self.column_index(field if field != self.model_id_field else self.sheet_id_field)))
+                field_cols.append((value_ix, self.column_index(field if field != self.model_id_field else self.sheet_id_field)))
             except ValueError:
                 logger.info(f'skipping field {field} because it has no header')
 
-        # order the field indexes by their col index
-        sorted_field_indexes = sorted(field_indexes, key=lambda x: x[1])
-
-        row_data = []
-        for field, ix in sorted_field_indexes:
-            logger.debug(f'writing data in field {field} to col ix {ix}')
-            row_data.append(data[field])
-
-        # get the row to update if it exists, otherwise we will add a new row
-        existing_row_ix = self.existing_row(**data)
-        if existing_row_ix is not None:
-            self.sheet_data[existing_row_ix] = row_data
-        else:
-            self.sheet_data.append(row_data)
+        return tuple(sorted(field_cols, key=operator.itemgetter(1)))
 
 
 class SheetPullInterface(BaseSheetInterface):
@@ -290,11 +601,13 @@ class SheetPullInterface(BaseSheetInterface):
     def pull_sheet(self):
         sheet_fields = self.pull_fields
         rows_start, rows_end = self.sheet_range_rows
+        # every row is needed, so load the data (and headers with it) rather than fetching the headers on their own
+        sheet_data = self.sheet_data
         field_indexes = {self.column_index(f): f for f in self.sheet_headers if f in sheet_fields or sheet_fields == 'all'}
         instances = []
         writeout_batch = []
 
-        for row_ix, row in enumerate(self.sheet_data):
+        for row_ix, row in enumerate(sheet_data):
             if len(writeout_batch) >= self.batch_size:
                 logger.debug('writing out a batch of instance IDs')
                 self.writeout_created_instance_ids(writeout_batch)
@@ -362,7 +675,25 @@ class SheetPullInterface(BaseSheetInterface):
 
         return instance, created
 
+    def reload_cached_sheet_data(self):
+        """ reloads the sheet data if it was loaded from the cache, as rows may have been added or moved in the sheet
+        since they were cached and the rows are about to be written to by their position
+        :raises: `ValueError` if the sheet has changed since it was cached
+        """
+        if not self._sheet_data_cached:
+            return
+
+        cached_headers, cached_data = self._sheet_headers, self._sheet_data
+        self.invalidate_sheet_cache()
+        self._sheet_data = None
+        if self.sheet_data != cached_data or self.sheet_headers != cached_headers:
+            raise ValueError(f'{self.sheet_range} has changed since it was cached, so rows can\'t be written to by '
+                             f'their position in the cached data')
+
     def writeout_created_instance_ids(self, created_instances):
+        # the rows of created instances are given by their position, so make sure they haven't moved
+        self.reload_cached_sheet_data()
+
         cols_start, cols_end = self.sheet_range_cols
         start_row = created_instances[0][1]
 
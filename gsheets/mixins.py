@@ -2,6 +2,7 @@ from googleapiclient.discovery import build
 from django.core.exceptions import ObjectDoesNotExist
 from .auth import get_gapi_credentials
 from .gsheets import SheetPullInterface, SheetPushInterface, SheetSync
+from functools import lru_cache
 import string
 import re
 import logging
@@ -27,6 +28,12 @@ class BaseGoogleSheetMixin(object):
     max_rows = 30000
     # max column to support in the sheet
     max_col = 'Z'
+    # seconds that fetched sheet data may be reused by pulls in the same process (0 disables caching)
+    sheet_cache_ttl = 0
+    # the number of batch writeouts to a sheet which may run concurrently
+    writeout_workers = 1
+    # push field values straight from the DB rather than building model instances (when all push fields are model fields)
+    use_values_list = True
 
 
 class SheetPushableMixin(BaseGoogleSheetMixin):
@@ -36,7 +43,9 @@ class SheetPushableMixin(BaseGoogleSheetMixin):
         interface = SheetPushInterface(cls, cls.spreadsheet_id, sheet_name=cls.sheet_name, data_range=cls.data_range,
                                        model_id_field=cls.model_id_field, sheet_id_field=cls.sheet_id_field,
                                        batch_size=cls.batch_size, max_rows=cls.max_rows, max_col=cls.max_col,
-                                       push_fields=cls.get_sheet_push_fields(), queryset=cls.get_sheet_queryset())
+                                       sheet_cache_ttl=cls.sheet_cache_ttl, writeout_workers=cls.writeout_workers,
+                                       use_values_list=cls.use_values_list, push_fields=cls.get_sheet_push_fields(),
+                                       queryset=cls.get_sheet_queryset())
         return interface.upsert_table()
 
     @classmethod
@@ -45,7 +54,14 @@ class SheetPushableMixin(BaseGoogleSheetMixin):
 
     @classmethod
     def get_sheet_push_fields(cls):
-        return [f.name for f in cls._meta.fields]
+        # returns a copy so overrides can extend the list without changing the cached fields
+        return list(cls._get_model_field_names())
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _get_model_field_names(cls):
+        # model fields don't change at runtime, so they're only looked up once per model
+        return tuple(f.name for f in cls._meta.fields)
 
 
 class SheetPullableMixin(BaseGoogleSheetMixin):
@@ -58,7 +74,8 @@ class SheetPullableMixin(BaseGoogleSheetMixin):
     def pull_sheet(cls):
         interface = SheetPullInterface(cls, cls.spreadsheet_id, sheet_name=cls.sheet_name, data_range=cls.data_range,
                                        model_id_field=cls.model_id_field, sheet_id_field=cls.sheet_id_field,
-                                       batch_size=cls.batch_size, max_rows=cls.max_rows, max_col=cls.max_col, pull_fields=cls.get_sheet_pull_fields())
+                                       batch_size=cls.batch_size, max_rows=cls.max_rows, max_col=cls.max_col,
+                                       sheet_cache_ttl=cls.sheet_cache_ttl, pull_fields=cls.get_sheet_pull_fields())
 
         return interface.pull_sheet()
 
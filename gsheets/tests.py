@@ -1,3 +1,221 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
+from .gsheets import SheetPullInterface, SheetPushInterface, _sheet_cache
+from .models import AccessCredentials
+import time
 
-# Create your tests here.
+
+class FakeRequest(object):
+    def __init__(self, response):
+        self.response = response
+
+    def execute(self, http=None):
+        if isinstance(self.response, Exception):
+            raise self.response
+
+        return self.response
+
+
+class FakeValuesApi(object):
+    """ stands in for the spreadsheets values resource, serving the given sheet values and recording writes """
+    def __init__(self, values, batch_update_error=None):
+        self.values = values
+        self.batch_update_error = batch_update_error
+        self.get_ranges = []
+        self.batch_updates = []
+
+    def get(self, spreadsheetId=None, range=None, **kwargs):
+        self.get_ranges.append(range)
+        if range.endswith('1:Z1'):
+            return FakeRequest({'values': self.values[:1]})
+
+        return FakeRequest({'values': self.values})
+
+    def batchUpdate(self, spreadsheetId=None, body=None):
+        self.batch_updates.append(body['data'])
+        return FakeRequest(self.batch_update_error or {})
+
+
+class Row(object):
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class SheetPushInterfaceTestCase(SimpleTestCase):
+    headers = ['Django GUID', 'name', 'notes', 'color']
+
+    def get_interface(self, values, queryset=None, push_fields=('id', 'name', 'color'), api_kwargs=None, **kwargs):
+        interface = SheetPushInterface(
+            AccessCredentials, 'spreadsheet', sheet_name='Sheet1', data_range='A1:Z', model_id_field='id',
+            sheet_id_field='Django GUID', batch_size=kwargs.pop('batch_size', 500), max_rows=30000, max_col='Z',
+            queryset=queryset or [], push_fields=push_fields, **kwargs
+        )
+        interface._values_api = FakeValuesApi(values, **(api_kwargs or {}))
+        # each thread builds its own client, so stub out building one rather than setting a single client
+        interface.authorized_http = object
+
+        return interface
+
+    def test_row_index_skips_blank_ids_and_keeps_first_duplicate(self):
+        interface = self.get_interface([self.headers, ['1', 'a'], [], ['', 'b'], ['2'], ['1', 'c']])
+
+        noop = interface.sheet_data
+
+        self.assertEqual(interface._row_index, {'1': 0, '2': 3})
+        self.assertEqual(interface.existing_row_for_id(1), 0)
+        self.assertEqual(interface.existing_row_for_id(2), 3)
+        self.assertIsNone(interface.existing_row_for_id(3))
+
+    def test_row_index_reports_duplicate_ids(self):
+        interface = self.get_interface([self.headers, ['1', 'a'], ['2', 'b'], ['1', 'c'], ['2', 'd'], ['1', 'e']])
+
+        with self.assertLogs('gsheets.gsheets', level='WARNING') as logs:
+            noop = interface.sheet_data
+
+        self.assertIn('found 3 duplicate IDs in column Django GUID', logs.output[0])
+        self.assertIn("['1', '2', '1']", logs.output[0])
+
+    def test_push_field_cols_ordered_by_column(self):
+        interface = self.get_interface([self.headers])
+
+        field_cols = interface.get_push_field_cols(('color', 'missing', 'id', 'name'))
+
+        self.assertEqual(field_cols, ((2, 0), (3, 1), (0, 3)))
+
+    def test_upsert_sheet_data_builds_sparse_rows(self):
+        interface = self.get_interface([self.headers, ['1', 'a', 'keep', 'red']])
+
+        interface.upsert_sheet_data(('id', 'name', 'color'), (1, 'b', 'blue'))
+        interface.upsert_sheet_data(('id', 'name', 'color'), (2, 'c', 'green'))
+
+        self.assertEqual(interface._changed_rows, {0: [1, 'b', None, 'blue'], 1: [2, 'c', None, 'green']})
+        self.assertEqual(interface.existing_row_for_id(2), 1)
+
+    def test_pop_changed_rows_splits_contiguous_blocks(self):
+        interface = self.get_interface([self.headers])
+        interface._changed_rows = {4: ['e'], 0: ['a'], 1: ['b'], 6: ['g'], 5: ['f']}
+
+        ranges, data = interface.pop_changed_rows()
+
+        self.assertEqual(ranges, ['Sheet1!A2:Z3', 'Sheet1!A6:Z8'])
+        self.assertEqual(data, [[['a'], ['b']], [['e'], ['f'], ['g']]])
+        self.assertEqual(interface.pop_changed_rows(), ([], []))
+
+    def test_upsert_table_writes_updates_and_new_rows_per_batch(self):
+        queryset = [Row(id=i, name=f'n{i}', color=f'c{i}') for i in (3, 1, 5, 6)]
+        interface = self.get_interface(
+            [self.headers, ['1', 'a'], ['2', 'b'], ['3', 'c']], queryset=queryset, batch_size=2
+        )
+
+        interface.upsert_table()
+
+        # the headers come with the sheet data, so the push makes a single read
+        self.assertEqual(interface.values_api.get_ranges, ['Sheet1!A1:Z'])
+        self.assertEqual(interface.values_api.batch_updates, [
+            [
+                {'range': 'Sheet1!A2:Z2', 'values': [[1, 'n1', None, 'c1']]},
+                {'range': 'Sheet1!A4:Z4', 'values': [[3, 'n3', None, 'c3']]},
+            ],
+            [
+                {'range': 'Sheet1!A5:Z6', 'values': [[5, 'n5', None, 'c5'], [6, 'n6', None, 'c6']]},
+            ],
+        ])
+
+    def test_upsert_table_raises_writeout_errors(self):
+        queryset = [Row(id=i, name='n', color='c') for i in range(4)]
+        interface = self.get_interface(
+            [self.headers], queryset=queryset, batch_size=1, api_kwargs={'batch_update_error': RuntimeError('boom')}
+        )
+
+        with self.assertRaises(RuntimeError):
+            interface.upsert_table()
+
+        # the first failed writeout stops the upsert rather than every batch being written out
+        self.assertEqual(len(interface.values_api.batch_updates), 1)
+
+    def test_existing_row_requires_sheet_id_col(self):
+        interface = self.get_interface([['name', 'color'], ['a', 'b']])
+
+        with self.assertRaises(ValueError):
+            interface.existing_row_for_id(1)
+
+    def test_sheet_headers_fetches_only_header_row(self):
+        interface = self.get_interface([self.headers, ['1', 'a']])
+
+        self.assertEqual(interface.column_index('color'), 3)
+        self.assertEqual(interface.values_api.get_ranges, ['Sheet1!A1:Z1'])
+        self.assertIsNone(interface._sheet_data)
+
+
+class SheetCacheTestCase(SimpleTestCase):
+    values = [['Django GUID', 'name'], ['1', 'a'], ['', 'b']]
+
+    def setUp(self):
+        _sheet_cache.clear()
+
+    def tearDown(self):
+        _sheet_cache.clear()
+
+    def get_interface(self, values, interface_cls=SheetPullInterface, sheet_cache_ttl=60, **kwargs):
+        interface = interface_cls(
+            AccessCredentials, 'spreadsheet', sheet_name='Sheet1', data_range='A1:Z', model_id_field='id',
+            sheet_id_field='Django GUID', batch_size=500, max_rows=30000, max_col='Z', sheet_cache_ttl=sheet_cache_ttl,
+            **kwargs
+        )
+        interface._values_api = FakeValuesApi(values)
+        interface.authorized_http = object
+
+        return interface
+
+    def test_pull_reads_fresh_cached_data(self):
+        noop = self.get_interface(self.values).sheet_data
+        interface = self.get_interface(self.values)
+
+        self.assertEqual(interface.sheet_data, self.values[1:])
+        self.assertEqual(interface.sheet_headers, self.values[0])
+        self.assertEqual(interface.existing_row_for_id(1), 0)
+        self.assertEqual(interface.values_api.get_ranges, [])
+
+    def test_pull_refetches_expired_cached_data(self):
+        noop = self.get_interface(self.values).sheet_data
+        fetched_time, headers, rows = _sheet_cache[('spreadsheet', 'Sheet1!A1:Z')]
+        _sheet_cache[('spreadsheet', 'Sheet1!A1:Z')] = (fetched_time - 60, headers, rows)
+        interface = self.get_interface(self.values)
+
+        noop = interface.sheet_data
+
+        self.assertEqual(interface.values_api.get_ranges, ['Sheet1!A1:Z'])
+
+    def test_sheet_data_not_cached_without_ttl(self):
+        noop = self.get_interface(self.values, sheet_cache_ttl=0).sheet_data
+
+        self.assertEqual(_sheet_cache, {})
+
+    def test_push_does_not_read_cached_data(self):
+        noop = self.get_interface(self.values).sheet_data
+        interface = self.get_interface(self.values, interface_cls=SheetPushInterface, queryset=[], push_fields=('id',))
+
+        noop = interface.sheet_data
+
+        self.assertEqual(interface.values_api.get_ranges, ['Sheet1!A1:Z'])
+
+    def test_writeout_created_ids_reloads_cached_data(self):
+        noop = self.get_interface(self.values).sheet_data
+        interface = self.get_interface(self.values)
+        noop = interface.sheet_data
+
+        interface.writeout_created_instance_ids([(Row(id=7), 3)])
+
+        self.assertEqual(interface.values_api.get_ranges, ['Sheet1!A1:Z'])
+        self.assertEqual(interface.values_api.batch_updates, [[{'range': 'Sheet1!A3:A3', 'values': [['7']]}]])
+        # the write leaves the cache stale, so it's dropped
+        self.assertEqual(_sheet_cache, {})
+
+    def test_writeout_created_ids_raises_if_cached_rows_moved(self):
+        noop = self.get_interface(self.values).sheet_data
+        interface = self.get_interface([self.values[0], ['', 'new row']] + self.values[1:])
+        noop = interface.sheet_data
+
+        with self.assertRaises(ValueError):
+            interface.writeout_created_instance_ids([(Row(id=7), 3)])
+
+        self.assertEqual(interface.values_api.batch_updates, [])